@@ -3,66 +3,239 @@
 
 __version__ = "2.1"
 
-import pymetar
+import argparse
+import json
+import os
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pymetar
+
+CACHEDIR = os.path.join(os.path.expanduser("~"), ".cache", "pymetar")
+# METARs are issued about once an hour, don't ask again for ten minutes
+# unless the server tells us otherwise with Cache-Control: max-age
+MAX_AGE = 60 * 10
+# After a failed fetch leave the station alone for a minute, doubling the
+# pause with every further failure up to one hour
+FAIL_AGE = 60
+FAIL_MAX_AGE = 60 * 60
+# Give up on a server that has not answered for this many seconds
+TIMEOUT = 30
+
+
+# The parsed value dump prints these WeatherReport fields in order, the
+# full report has its own section and the private caches of derived
+# values are left out
+FIELDS = tuple(name for name in pymetar.WeatherReport.__slots__
+               if name != "fullreport" and not name.startswith("_"))
+
+# The getter dump calls these in order, labelled with the method name
+GETTERS = (
+    "getTemperatureCelsius", "getTemperatureFahrenheit", "getDewPointCelsius",
+    "getDewPointFahrenheit", "getWindSpeed", "getWindSpeedMilesPerHour",
+    "getWindDirection", "getWindCompass", "getVisibilityKilometers",
+    "getVisibilityMiles", "getHumidity", "getPressure", "getRawMetarCode",
+    "getWeather", "getSkyConditions", "getStationName", "getStationCity",
+    "getStationCountry", "getCycle", "getStationPosition",
+    "getStationPositionFloat", "getStationLatitude", "getStationLatitudeFloat",
+    "getStationLongitude", "getStationLongitudeFloat", "getStationAltitude",
+    "getReportURL", "getTime", "getISOTime", "getPixmap", "getCloudtype",
+    "getWindchill", "getWindchillF", "getCloudinfo", "getConditions",
+)
+
+
+def note_failure(failfile, failures):
+    """
+    Record one more failed fetch in failfile, its mtime is the time.
+    Best effort: if the cache cannot be written, the backoff is lost.
+    """
+    try:
+        os.makedirs(CACHEDIR, exist_ok=True)
+        with open(failfile, "w") as fd:
+            fd.write("%d" % (failures + 1))
+    except OSError:
+        pass
+
+
+def expired_report(rf, station, cache, why):
+    """
+    Return the expired cached report for station, an expired report
+    beats none at all. Say so on stderr, giving why it was not fetched.
+    """
+    sys.stderr.write("Using the expired cached %s report: %s\n" %
+                     (station, why))
+    return rf.MakeReport(station, cache["full_report"].encode("latin-1"))
+
+
+def cached_fetch(station):
+    """
+    Fetch the report for station, revalidating a locally cached copy
+    with If-None-Match/If-Modified-Since. If the server answers 304
+    Not Modified, the cached report is reused instead of downloaded.
+    A cached copy younger than its max-age is used without asking the
+    server at all. After a failed fetch, the station is not asked again
+    until a backoff period has passed. Both when the fetch fails and
+    during the backoff, an expired cached copy is returned if there is
+    one, with a note on stderr.
+    """
+    rf = pymetar.ReportFetcher(station)
+    station = station.upper()
+    # Wall clock time, as it is compared with file mtimes. One reading
+    # serves the whole call.
+    now = time.time()
+    # Some caches in front of the NOAA server hand out stale reports for
+    # a while after a new cycle started. Varying the query string once
+    # per hour gets us past them without defeating caching altogether.
+    url = "%s%s.TXT?cycle=%s" % (rf.baseurl, station,
+                                 time.strftime("%Y%m%d%H", time.gmtime(now)))
+    cachefile = os.path.join(CACHEDIR, "%s.json" % station)
+    failfile = os.path.join(CACHEDIR, "%s.fail" % station)
+
+    try:
+        # The cache file's mtime is the time it was last (re)validated
+        with open(cachefile) as fd:
+            fetched_at = os.fstat(fd.fileno()).st_mtime
+            cache = json.load(fd)
+    except (OSError, ValueError):
+        cache = {}
+    else:
+        if ("full_report" in cache and
+                fetched_at > now - cache.get("max_age", MAX_AGE)):
+            return rf.MakeReport(station,
+                                 cache["full_report"].encode("latin-1"))
+
+    try:
+        with open(failfile) as fd:
+            failed_at = os.fstat(fd.fileno()).st_mtime
+            failures = int(fd.read())
+    except (OSError, ValueError):
+        failures = 0
+    if failures:
+        wait = min(FAIL_AGE * 2 ** (failures - 1), FAIL_MAX_AGE)
+        if failed_at > now - wait:
+            why = ("%d earlier failure(s), not retrying for %d s" %
+                   (failures, failed_at + wait - now))
+            if "full_report" in cache:
+                return expired_report(rf, station, cache, why)
+            raise pymetar.NetworkException(why)
+
+    if "full_report" in cache:
+        etag = cache.get("etag")
+        last_modified = cache.get("last_modified")
+    else:
+        etag = last_modified = None
+    try:
+        report, etag, last_modified, max_age = pymetar.fetch_report(
+            url, timeout=TIMEOUT, etag=etag, last_modified=last_modified)
+    except pymetar.NetworkException as why:
+        note_failure(failfile, failures)
+        if "full_report" in cache:
+            return expired_report(rf, station, cache, why)
+        raise
+    if report is None:
+        # Not Modified
+        full_report = cache["full_report"]
+    else:
+        # latin-1 maps every byte to one char, so the report survives
+        # the round trip through JSON unchanged
+        full_report = report.decode("latin-1")
+    updated = {"etag": etag,
+               "last_modified": last_modified,
+               "full_report": full_report,
+               "max_age": MAX_AGE if max_age is None else max_age}
+    # The cache only saves round trips, a report fetched fine is returned
+    # even if it cannot be stored
+    try:
+        if updated == cache:
+            # Same report and headers as cached, refreshing the mtime is
+            # enough to mark the cached copy as fresh again
+            os.utime(cachefile)
+        else:
+            os.makedirs(CACHEDIR, exist_ok=True)
+            # A temporary file of its own, so that concurrent runs and
+            # threads never write into each other's file before swapping
+            # it in
+            handle, tmpfile = tempfile.mkstemp(prefix=station + ".",
+                                               suffix=".tmp", dir=CACHEDIR)
+            try:
+                with open(handle, "w") as fd:
+                    json.dump(updated, fd)
+                os.replace(tmpfile, cachefile)
+            except OSError:
+                os.unlink(tmpfile)
+                raise
+    except OSError as why:
+        sys.stderr.write("Caching %s failed: %s\n" % (station, why))
+    if failures:
+        try:
+            os.unlink(failfile)
+        except FileNotFoundError:
+            # Another run got there first
+            pass
+        except OSError as why:
+            sys.stderr.write("Caching %s failed: %s\n" % (station, why))
+
+    return rf.MakeReport(station, full_report.encode("latin-1"))
+
+
+def main(argv=None):
+    """
+    Fetch, parse and dump the stations given in argv. Return the exit
+    status, 1 if any station could not be fetched.
+    """
+    parser = argparse.ArgumentParser(
+        description="Dump everything pymetar knows about some stations.")
+    parser.add_argument("stations", metavar="station", nargs="*",
+                        default=["NZCM"], help="METAR station ID")
+    parser.add_argument("--json", action="store_true",
+                        help="print the getter values as JSON, "
+                             "keyed by station")
+    args = parser.parse_args(argv)
+    # Each station once, two fetches of the same one would only race
+    # for its cache file
+    stations = list(dict.fromkeys(station.upper()
+                                  for station in args.stations))
+
+    # Fetching is I/O bound, so threads let the network round trips overlap
+    with ThreadPoolExecutor(max_workers=min(16, len(stations))) as ex:
+        futures = [ex.submit(cached_fetch, station) for station in stations]
+    # A station that fails must not cost us the others
+    reports = []
+    status = 0
+    for station, future in zip(stations, futures):
+        try:
+            reports.append(future.result())
+        except pymetar.NetworkException as why:
+            sys.stderr.write("Fetching %s failed: %s\n" % (station, why))
+            status = 1
+    reports = pymetar.ReportParser().ParseReports(reports)
+
+    if args.json:
+        json.dump({pr.givenstationid: {name: getattr(pr, name)()
+                                       for name in GETTERS}
+                   for pr in reports}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return status
+
+    # Collect the whole dump and write it at once instead of one print()
+    # (and, on a terminal, one write syscall) per line
+    lines = ["pymet v%s using pymetar lib v%s" %
+             (__version__, pymetar.__version__)]
+    for pr in reports:
+        lines += ["--------- Full report ---------",
+                  str(pr.fullreport),
+                  "------- End full report -------",
+                  "-------- Parsed Values --------"]
+        lines.extend(f"{name}: {getattr(pr, name)}" for name in FIELDS)
+        lines += ["------ End Parsed Values ------",
+                  "----- Report getFunctions -----"]
+        lines.extend(f"{name}(): {getattr(pr, name)()}" for name in GETTERS)
+        lines.append("--- End Report getFunctions ---")
+    sys.stdout.write("\n".join(lines) + "\n")
+    return status
+
 
-print("pymet v%s using pymetar lib v%s" % (__version__, pymetar.__version__))
-
-if len(sys.argv) < 2:
-    station = "NZCM"
-else:
-    station = sys.argv[1]
-
-rf = pymetar.ReportFetcher(station)
-rep = rf.FetchReport()
-rp = pymetar.ReportParser()
-pr = rp.ParseReport(rep.decode())
-
-print("--------- Full report ---------")
-print(pr.fullreport)
-print("------- End full report -------")
-
-print("-------- Parsed Values --------")
-for k in list(pr.__dict__.keys()):
-    if k != "fullreport":
-        print("%s: %s" % (k, pr.__dict__[k]))
-print("------ End Parsed Values ------")
-
-print("----- Report getFunctions -----")
-print("getTemperatureCelsius(): %s" % (pr.getTemperatureCelsius()))
-print("getTemperatureFahrenheit(): %s" % (pr.getTemperatureFahrenheit()))
-print("getDewPointCelsius(): %s" % (pr.getDewPointCelsius()))
-print("getDewPointFahrenheit(): %s" % (pr.getDewPointFahrenheit()))
-print("getWindSpeed(): %s" % (pr.getWindSpeed()))
-print("getWindSpeedMilesPerHour(): %s" % (pr.getWindSpeedMilesPerHour()))
-print("getWindDirection(): %s" % (pr.getWindDirection()))
-print("getWindCompass(): %s" % (pr.getWindCompass()))
-print("getVisibilityKilometers(): %s" % (pr.getVisibilityKilometers()))
-print("getVisibilityMiles(): %s" % (pr.getVisibilityMiles()))
-print("getHumidity(): %s" % (pr.getHumidity()))
-print("getPressure(): %s" % (pr.getPressure()))
-print("getRawMetarCode(): %s" % (pr.getRawMetarCode()))
-print("getWeather(): %s" % (pr.getWeather()))
-print("getSkyConditions(): %s" % (pr.getSkyConditions()))
-print("getStationName(): %s" % (pr.getStationName()))
-print("getStationCity(): %s" % (pr.getStationCity()))
-print("getStationCountry(): %s" % (pr.getStationCountry()))
-print("getCycle(): %s" % (pr.getCycle()))
-print("getStationPosition(): %s" % (repr(pr.getStationPosition())))
-print("getStationPositionFloat(): %s" % (repr(pr.getStationPositionFloat())))
-print("getStationLatitude(): %s" % (pr.getStationLatitude()))
-print("getStationLatitudeFloat(): %s" % (pr.getStationLatitudeFloat()))
-print("getStationLongitude(): %s" % (pr.getStationLongitude()))
-print("getStationLongitudeFloat(): %s" % (pr.getStationLongitudeFloat()))
-print("getStationAltitude(): %s" % (pr.getStationAltitude()))
-print("getReportURL(): %s" % (pr.getReportURL()))
-print("getTime(): %s" % (pr.getTime()))
-print("getISOTime(): %s" % (pr.getISOTime()))
-print("getPixmap(): %s" % (pr.getPixmap()))
-print("getCloudtype(): %s" % (pr.getCloudtype()))
-print("getWindchill(): %s" % (pr.getWindchill()))
-print("getWindchillF(): %s" % (pr.getWindchillF()))
-print("getCloudinfo(): %s" % (repr(pr.getCloudinfo())))
-print("getConditions(): %s" % (repr(pr.getConditions())))
-
-print("--- End Report getFunctions ---")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,7 +20,12 @@ included weather information.
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA."""
 #
+import bisect
+import concurrent.futures
+import http.client
 import re
+import time
+import types
 
 import urllib.request  # noqa: E402
 import urllib.error    # noqa: E402
@@ -36,6 +41,29 @@ COND_RE_STR = (r"^[-+]?(VC|MI|BC|PR|TS|BL|SH|DR|FZ)?(DZ|RA|SN|SG|IC|PE|"
                r"GR|GS|UP|BR|FG|FU|VA|SA|HZ|PY|DU|SQ|SS|DS|PO|\+?FC)$")
 
 
+def _group_scanner(regexp):
+    """
+    Turn a regexp matching one whole group of the encoded report, i.e.
+    anchored with ^ and $, into a compiled pattern that finds all such
+    groups in the complete encoded report in a single scan.
+    """
+    return re.compile(r"(?<!\S)(?:%s)(?!\S)" % regexp[1:-1])
+
+
+# Compiled once at import instead of on every ReportParser run
+_CLOUD_RE = _group_scanner(CLOUD_RE_STR)
+_COND_RE = _group_scanner(COND_RE_STR)
+
+# URL openers by proxy, see _get_opener()
+_OPENERS = {}
+
+# Last report fetched from each URL as (time.monotonic(), report, ETag,
+# Last-Modified, Cache-Control max-age or None), see
+# ReportFetcher.FetchReport()
+_REPORT_CACHE = {}
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
 class EmptyReportException(Exception):
     """This gets thrown when the ReportParser gets fed an empty report"""
 
@@ -345,6 +373,12 @@ _WEATHER_CONDITIONS = {
            }),
 }
 
+# The tables are shared by all parsers (and threads using them), so they
+# are handed out as read-only views
+_WEATHER_CONDITIONS = types.MappingProxyType({
+    phen: (name, pixmap, types.MappingProxyType(quals))
+    for phen, (name, pixmap, quals) in _WEATHER_CONDITIONS.items()})
+
 CLOUDTYPES = {
     "ACC": "altocumulus castellanus",
     "ACSL": "standing lenticular altocumulus",
@@ -357,17 +391,65 @@ CLOUDTYPES = {
     "TCU": "towering cumulus"
 }
 
+# Sky description and suggested pixmap by the first three characters of
+# a cloud group (CAVOK is shortened to CAV)
+_SKY_TYPES = types.MappingProxyType({
+    "CLR": ("Clear sky", "sun"),
+    "SKC": ("Clear sky", "sun"),
+    "CAV": ("Clear sky", "sun"),
+    "NSC": ("Clear sky", "sun"),
+    "BKN": ("Broken clouds", "suncloud"),
+    "SCT": ("Scattered clouds", "suncloud"),
+    "FEW": ("Few clouds", "suncloud"),
+    "OVC": ("Overcast", "cloud"),
+})
+
+# Upper wind speed limits in m/s of the Beaufort forces 0 to 16. These
+# are the bounds at which round((v / 0.8359648) ** (2 / 3.0)) steps up,
+# so looking up v here matches that force without the power, except
+# exactly at the half-force boundaries: round() takes halves to the even
+# force, the lookup always to the higher one.
+_BEAUFORT_LIMITS = tuple(0.8359648 * (force + 0.5) ** 1.5
+                         for force in range(17))
+
 
 def metar_to_iso8601(metardate):
     """Convert a metar date to an ISO8601 date."""
     if metardate is not None:
-        (date, hour) = metardate.split()[:2]
+        # Only date and hour are needed, the rest ("UTC") stays unsplit
+        (date, hour) = metardate.split(None, 2)[:2]
         (year, month, day) = date.split('.')
         # assuming tz is always 'UTC', aka 'Z'
         return ("%s-%s-%s %s:%s:00Z" %
                 (year, month, day, hour[:2], hour[2:4]))
 
 
+def windchill_celsius(temp, windspeed):
+    """
+    Return the North American wind chill index in degrees Celsius for
+    a temperature in degrees Celsius and a wind speed in m/s. The index
+    is defined for temperatures up to 10 C and wind speeds above
+    4.8 km/h. Only arithmetic operators are used, so this works on
+    NumPy arrays just as well as on floats.
+    """
+    # https://en.wikipedia.org/wiki/Wind_chill - North American wind chill
+    # index
+    kph_016 = (windspeed * 3.6) ** 0.16
+    return 13.12 + 0.6215 * temp - 11.37 * kph_016 + 0.3965 * temp * kph_016
+
+
+def windchill_fahrenheit(tempf, windspeedmph):
+    """
+    Return the North American wind chill index in degrees Fahrenheit
+    for a temperature in degrees Fahrenheit and a wind speed in miles
+    per hour. The index is defined for temperatures up to 50 F and wind
+    speeds of at least 3 mph. Like windchill_celsius(), this works on
+    NumPy arrays as well as on floats.
+    """
+    mph_016 = windspeedmph ** 0.16
+    return 35.74 + 0.6215 * tempf - 35.75 * mph_016 + 0.4275 * tempf * mph_016
+
+
 def _parse_lat_long(latlong):
     """
     Parse Lat or Long in METAR notation into float values. N and E
@@ -403,11 +485,135 @@ def _parse_lat_long(latlong):
     return coords
 
 
+def _parse_f_c(data):
+    """
+    Parse a temperature-like line value such as "71 F (22 C)" and
+    return it as a (fahrenheit, celsius) tuple of floats.
+    """
+    fields = data.split(None, 3)
+    # The celsius field we have split is "(NN", hence the slice
+    return float(fields[0]), float(fields[2][1:])
+
+
+def _get_opener(proxy):
+    """
+    Return the URL opener for the given proxy URL (None meaning the
+    proxies from the environment), building it on first use. Openers
+    are reused across fetches instead of being rebuilt and installed
+    globally every time.
+    """
+    opener = _OPENERS.get(proxy)
+    if opener is None:
+        if proxy:
+            p_handler = urllib.request.ProxyHandler({'http': proxy})
+        else:
+            p_handler = urllib.request.ProxyHandler()
+        opener = urllib.request.build_opener(p_handler,
+                                             urllib.request.HTTPHandler)
+        _OPENERS[proxy] = opener
+    return opener
+
+
+def _cache_max_age(headers):
+    """
+    Return the max-age in seconds given in the Cache-Control header of
+    a response's headers, or None if there is none.
+    """
+    match = _MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def set_opener(opener, proxy=None):
+    """
+    Make ReportFetcher use the given urllib opener (as returned by
+    urllib.request.build_opener()) for all fetches through the given
+    proxy URL (None meaning the proxies from the environment). This
+    allows plugging in custom handlers, for example ones that keep
+    connections alive. Passing None as opener restores the default.
+    """
+    if opener is None:
+        _OPENERS.pop(proxy, None)
+    else:
+        _OPENERS[proxy] = opener
+
+
+def fetch_report(url, proxy=None, timeout=None, etag=None,
+                 last_modified=None):
+    """
+    Fetch the report at url and return it as a tuple (report, etag,
+    last_modified, max_age): the raw report, the ETag and Last-Modified
+    headers of the response and the max-age of its Cache-Control header
+    (None if missing). proxy and timeout are used as in
+    ReportFetcher.FetchReport().
+    If the ETag and/or Last-Modified of a previously fetched copy are
+    given, the server only sends the report if it has changed since.
+    If it has not, report is None and the previous copy is current.
+    Raises NetworkException if the report can't be fetched.
+    """
+    request = urllib.request.Request(url)
+    if etag:
+        request.add_header("If-None-Match", etag)
+    if last_modified:
+        request.add_header("If-Modified-Since", last_modified)
+
+    opener = _get_opener(proxy)
+    try:
+        if timeout is None:
+            fn = opener.open(request)
+        else:
+            fn = opener.open(request, timeout=timeout)
+    except urllib.error.HTTPError as why:
+        why.close()
+        if why.code != 304 or not (etag or last_modified):
+            raise NetworkException(why)
+        # Not Modified, the body is empty
+        return (None, why.headers.get("ETag", etag),
+                why.headers.get("Last-Modified", last_modified),
+                _cache_max_age(why.headers))
+    except (OSError, http.client.HTTPException) as why:
+        # Connection refused, host not found, timed out, garbled
+        # answer, ... (URLError is an OSError)
+        raise NetworkException(why)
+
+    # Read the entire report, releasing the connection right away
+    # instead of whenever the response is collected
+    with fn:
+        try:
+            report = fn.read()
+        except (OSError, http.client.HTTPException) as why:
+            raise NetworkException(why)
+
+    if fn.status != 200:
+        raise NetworkException(
+            "Could not fetch METAR report: %s" % (fn.status))
+
+    return (report, fn.headers.get("ETag"), fn.headers.get("Last-Modified"),
+            _cache_max_age(fn.headers))
+
+
 class WeatherReport:
     """Incorporates both the unparsed textual representation of the
     weather report and the parsed values as soon as they are filled
     in by ReportParser."""
 
+    # A report has a fixed set of fields, slots make them cheaper to
+    # access and store than an instance dict. _clearallfields() assigns
+    # every one of them. __dict__ stays available, created only when
+    # used, so that callers may still hang their own attributes on a
+    # report and vars() keeps working.
+    __slots__ = (
+        "valid", "givenstationid", "fullreport", "temp", "tempf",
+        "windspeed", "windspeedmph", "windspeedkt", "winddir", "vis",
+        "dewp", "dewpf", "humid", "press", "pressmmHg", "code",
+        "weather", "sky", "fulln", "cycle", "windcomp", "rtime",
+        "pixmap", "latitude", "longitude", "altitude", "stat_city",
+        "stat_country", "reporturl", "latf", "longf", "cloudinfo",
+        "conditions", "w_chill", "w_chillf", "cloudtype", "_beaufort",
+        "_isotime", "__dict__"
+    )
+
     def _clearallfields(self):
         """Clear all fields values."""
         # until finished, report is invalid
@@ -419,6 +625,7 @@ class WeatherReport:
         self.tempf = None
         self.windspeed = None
         self.windspeedmph = None
+        self.windspeedkt = None
         self.winddir = None
         self.vis = None
         self.dewp = None
@@ -447,6 +654,9 @@ class WeatherReport:
         self.w_chill = None
         self.w_chillf = None
         self.cloudtype = None
+        # derived values, cached on first access by their getter
+        self._beaufort = None
+        self._isotime = None
 
     def __init__(self, MetarStationCode=None):
         """Clear all fields and fill in wanted station id."""
@@ -498,8 +708,14 @@ class WeatherReport:
         Return the wind speed in the Beaufort scale
         cf. https://en.wikipedia.org/wiki/Beaufort_scale
         """
-        if self.windspeed is not None:
-            return round((self.windspeed / 0.8359648) ** (2 / 3.0))
+        if self._beaufort is None and self.windspeed is not None:
+            if self.windspeed < _BEAUFORT_LIMITS[-1]:
+                self._beaufort = bisect.bisect_right(_BEAUFORT_LIMITS,
+                                                     self.windspeed)
+            else:
+                self._beaufort = round(
+                    (self.windspeed / 0.8359648) ** (2 / 3.0))
+        return self._beaufort
 
     def getWindSpeedKnots(self):
         """
@@ -684,7 +900,9 @@ class WeatherReport:
         Return the time when the observation was made in ISO 8601 format
         (e.g. 2002-07-25 15:12:00Z)
         """
-        return metar_to_iso8601(self.rtime)
+        if self._isotime is None:
+            self._isotime = metar_to_iso8601(self.rtime)
+        return self._isotime
 
     def getPixmap(self):
         """
@@ -714,13 +932,11 @@ class WeatherReport:
         # https://en.wikipedia.org/wiki/Wind_chill - North American wind chill
         # index
         if self.w_chill is None:
-            if (self.temp and self.temp <= 10 and
-                    self.windspeed and (self.windspeed * 3.6) > 4.8):
+            if (self.temp is not None and self.temp <= 10 and
+                    self.windspeed is not None and
+                    (self.windspeed * 3.6) > 4.8):
 
-                self.w_chill = (13.12 + 0.6215 * self.temp -
-                                11.37 * (self.windspeed * 3.6) ** 0.16 +
-                                0.3965 * self.temp *
-                                (self.windspeed * 3.6) ** 0.16)
+                self.w_chill = windchill_celsius(self.temp, self.windspeed)
         return self.w_chill
 
     def getWindchillF(self):
@@ -730,13 +946,12 @@ class WeatherReport:
         # https://en.wikipedia.org/wiki/Wind_chill - North American wind chill
         # index
         if self.w_chillf is None:
-            if (self.tempf and self.tempf <= 50 and
-                    self.windspeedmph and self.windspeedmph >= 3):
+            if (self.tempf is not None and self.tempf <= 50 and
+                    self.windspeedmph is not None and
+                    self.windspeedmph >= 3):
 
-                self.w_chillf = (35.74 + 0.6215 * self.tempf -
-                                 35.75 * self.windspeedmph ** 0.16 +
-                                 0.4275 * self.tempf *
-                                 self.windspeedmph ** 0.16)
+                self.w_chillf = windchill_fahrenheit(self.tempf,
+                                                     self.windspeedmph)
             else:
                 self.w_chillf = self.tempf
 
@@ -763,28 +978,15 @@ class ReportParser:
         Extract cloud information. Return None or a tuple (sky type as a
         string of text, cloud type (if any)  and suggested pixmap name)
         """
-        matches = self.match_WeatherPart(CLOUD_RE_STR)
+        matches = self._scan_WeatherPart(_CLOUD_RE)
         skytype = None
         ctype = None
         pixmap = None
         for wcloud in matches:
             if wcloud is not None:
-                stype = wcloud[:3]
-                if stype in ("CLR", "SKC", "CAV", "NSC"):
-                    skytype = "Clear sky"
-                    pixmap = "sun"
-                elif stype == "BKN":
-                    skytype = "Broken clouds"
-                    pixmap = "suncloud"
-                elif stype == "SCT":
-                    skytype = "Scattered clouds"
-                    pixmap = "suncloud"
-                elif stype == "FEW":
-                    skytype = "Few clouds"
-                    pixmap = "suncloud"
-                elif stype == "OVC":
-                    skytype = "Overcast"
-                    pixmap = "cloud"
+                stype = _SKY_TYPES.get(wcloud[:3])
+                if stype is not None:
+                    (skytype, pixmap) = stype
                 if ctype is None:
                     ctype = CLOUDTYPES.get(wcloud[6:], None)
 
@@ -797,12 +999,14 @@ class ReportParser:
         string and a suggested pixmap name for an icon representing said
         sky condition.
         """
-        matches = self.match_WeatherPart(COND_RE_STR)
+        matches = self._scan_WeatherPart(_COND_RE)
         for wcond in matches:
-            if len(wcond) > 3 and wcond.startswith(('+', '-')):
+            signed = wcond[0] in "+-"
+            if signed and len(wcond) > 3:
                 wcond = wcond[1:]
+                signed = wcond[0] in "+-"
 
-            if wcond.startswith(('+', '-')):
+            if signed:
                 pphen = 1
             elif len(wcond) < 4:
                 pphen = 0
@@ -820,24 +1024,136 @@ class ReportParser:
                     # contains pixmap info
                     return pheninfo
 
+    def _scan_WeatherPart(self, scanner):
+        """
+        Return all groups of the encoded Metar report matched by
+        scanner, a pattern made by _group_scanner(). Unlike
+        match_WeatherPart(), this does not split the report and match
+        every group on its own.
+        """
+        if self.Report.code is None:
+            return []
+        return [match.group() for match in scanner.finditer(self.Report.code)]
+
     def match_WeatherPart(self, regexp):
         """
         Return the matching part of the encoded Metar report.
-        regexp: the regexp needed to extract this part.
+        regexp: the regexp needed to extract this part, either as a
+        string or as a compiled pattern.
         Return the first matching string or None.
         WARNING: Some Metar reports may contain several matching
         strings, only the first one is taken into account!
         """
         matches = []
-        # FIXME This mixes direct access to the "code" attribute and the accessor function "getRawMetarCode" which just returns "code".
-        if self.Report.code is not None:
-            myre = re.compile(regexp)
-            for wpart in self.Report.getRawMetarCode().split():
-                match = myre.match(wpart)
+        code = self.Report.code
+        if code is not None:
+            if not isinstance(regexp, re.Pattern):
+                regexp = re.compile(regexp)
+            for wpart in code.split():
+                match = regexp.match(wpart)
                 if match:
                     matches.append(match.group())
         return matches
 
+    def _parse_temperature(self, data):
+        """Parse the data of a "Temperature" line."""
+        self.Report.tempf, self.Report.temp = _parse_f_c(data)
+
+    def _parse_windchill(self, data):
+        """Parse the data of a "Windchill" line."""
+        self.Report.w_chillf, self.Report.w_chill = _parse_f_c(data)
+
+    def _parse_wind(self, data):
+        """Parse the wind direction and speed of a "Wind" line."""
+        if "Calm" in data:
+            self.Report.windspeed = 0.0
+            self.Report.windspeedkt = 0.0
+            self.Report.windspeedmph = 0.0
+            self.Report.winddir = None
+            self.Report.windcomp = None
+        elif "Variable" in data:
+            # "Variable at 3 MPH (3 KT)"
+            fields = data.split(" ")
+            speed = fields[2]
+            self.Report.windspeed = (float(speed) * 0.44704)
+            self.Report.windspeedkt = int(fields[4][1:])
+            self.Report.windspeedmph = int(speed)
+            self.Report.winddir = None
+            self.Report.windcomp = None
+        else:
+            # "from the SW (220 degrees) at 18 MPH (16 KT)"
+            fields = data.split(" ")
+            comp = fields[2]
+            deg = fields[3]
+            speed = fields[6]
+            speedkt = fields[8][1:]
+            self.Report.winddir = int(deg[1:])
+            self.Report.windcomp = comp.strip()
+            self.Report.windspeed = (float(speed) * 0.44704)
+            self.Report.windspeedkt = (int(speedkt))
+            self.Report.windspeedmph = int(speed)
+
+    def _parse_visibility(self, data):
+        """Parse the data of a "Visibility" line."""
+        # Only the first group can be the distance in miles, anything
+        # else ("greater than 7 mile(s)") leaves it unknown
+        if data:
+            try:
+                self.Report.vis = float(data.split(None, 1)[0]) * 1.609344
+            except ValueError:
+                self.Report.vis = None
+
+    def _parse_dewpoint(self, data):
+        """Parse the data of a "Dew Point" line."""
+        self.Report.dewpf, self.Report.dewp = _parse_f_c(data)
+
+    def _parse_humidity(self, data):
+        """Parse the data of a "Relative Humidity" line."""
+        self.Report.humid = int(data.partition("%")[0])
+
+    def _parse_pressure(self, data):
+        """Parse the data of a "Pressure (altimeter)" line."""
+        press = float(data.partition(" ")[0])
+        self.Report.press = press * 33.863886
+        # 1 in = 25.4 mm => 1 inHg = 25.4 mmHg
+        self.Report.pressmmHg = press * 25.4000
+
+    def _parse_weather(self, data):
+        """Parse the short weather desc. ("rain", "mist", ...)"""
+        self.Report.weather = data
+
+    def _parse_sky(self, data):
+        """Parse the short desc. of sky conditions"""
+        self.Report.sky = data
+
+    def _parse_code(self, data):
+        """Parse the "ob" line, the encoded report itself"""
+        self.Report.code = data.strip()
+
+    def _parse_cycle(self, data):
+        """Parse the cycle value ("time slot")"""
+        try:
+            self.Report.cycle = int(data)
+        except ValueError:
+            # cycle value is missing or garbled, assume cycle 0
+            # TODO: parse the date/time header if it isn't too involved
+            self.Report.cycle = 0
+
+    # Parsing function for the data of each known line header
+    _HEADER_HANDLERS = {
+        "Temperature": _parse_temperature,
+        "Windchill": _parse_windchill,
+        "Wind": _parse_wind,
+        "Visibility": _parse_visibility,
+        "Dew Point": _parse_dewpoint,
+        "Relative Humidity": _parse_humidity,
+        "Pressure (altimeter)": _parse_pressure,
+        "Weather": _parse_weather,
+        "Sky conditions": _parse_sky,
+        "ob": _parse_code,
+        "cycle": _parse_cycle,
+    }
+
     def ParseReport(self, MetarReport=None):
         """Take report with raw info only and return it with in
         parsed values filled in. Note: This function edits the
@@ -849,34 +1165,44 @@ class ReportParser:
             self.Report = MetarReport
 
         try:
-            lines = self.Report.fullreport.decode().split("\n")
+            lines = self.Report.fullreport.decode().splitlines()
         except UnicodeDecodeError:
             raise GarbledReportException(
                 "Report is not valid ASCII or Unicode.")
 
+        stationid = self.Report.givenstationid
+        station_needle = "(" + stationid + ")"
+        handlers = self._HEADER_HANDLERS
+
         for line in lines:
-            try:
-                header, data = line.split(":", 1)
-            except ValueError:
+            if not line:
+                continue
+
+            header, sep, data = line.partition(":")
+            if not sep:
                 header = data = line
 
             header = header.strip()
             data = data.strip()
 
+            # Most lines are told apart by their header alone
+            handler = handlers.get(header)
+            if handler is not None:
+                handler(self, data)
+                continue
+
             # The station id inside the report
             # As the station line may contain additional sets of (),
-            # we have to search from the rear end and flip things around
-            if header.find("(" + self.Report.givenstationid + ")") != -1:
-                id_offset = header.find("(" + self.Report.givenstationid + ")")
-                loc = data[:id_offset]
+            # we have to split city and country at the last comma
+            id_offset = header.find(station_needle)
+            if id_offset != -1:
+                loc = data[:id_offset].strip()
                 coords = data[id_offset:]
                 try:
-                    loc = loc.strip()
-                    rloc = loc[::-1]
-                    rcoun, rcity = rloc.split(",", 1)
+                    city, country = loc.rsplit(",", 1)
                 except ValueError:
-                    rcity = ""
-                    rcoun = ""
+                    city = ""
+                    country = ""
                     coords = data
                 try:
                     lat, lng, alt = coords.split()[1:4]
@@ -894,8 +1220,8 @@ class ReportParser:
                 if lng and "O" in lng:
                     lng = lng.replace("O", "0")
 
-                self.Report.stat_city = rcity.strip()[::-1]
-                self.Report.stat_country = rcoun.strip()[::-1]
+                self.Report.stat_city = city.strip()
+                self.Report.stat_country = country.strip()
                 self.Report.fulln = loc
                 self.Report.latitude = lat
                 self.Report.longitude = lng
@@ -906,112 +1232,10 @@ class ReportParser:
             # The line containing date and time of the report
             # We have to make sure that the station ID is *not*
             # in this line to avoid trying to parse the ob: line
-            elif " UTC" in data and self.Report.givenstationid not in data:
+            elif " UTC" in data and stationid not in data:
                 rtime = data.split("/")[1]
                 self.Report.rtime = rtime.strip()
 
-            # temperature
-
-            elif header == "Temperature":
-                fnht, cels = data.split(None, 3)[0:3:2]
-                self.Report.tempf = float(fnht)
-                # The string we have split is "(NN C)", hence the slice
-                self.Report.temp = float(cels[1:])
-
-            # wind chill
-
-            elif header == "Windchill":
-                fnht, cels = data.split(None, 3)[0:3:2]
-                self.Report.w_chillf = float(fnht)
-                # The string we have split is "(NN C)", hence the slice
-                self.Report.w_chill = float(cels[1:])
-
-            # wind dir and speed
-
-            elif header == "Wind":
-                if "Calm" in data:
-                    self.Report.windspeed = 0.0
-                    self.Report.windspeedkt = 0.0
-                    self.Report.windspeedmph = 0.0
-                    self.Report.winddir = None
-                    self.Report.windcomp = None
-                elif "Variable" in data:
-                    speed = data.split(" ", 3)[2]
-                    self.Report.windspeed = (float(speed) * 0.44704)
-                    self.Report.windspeedkt = int(data.split(" ", 5)[4][1:])
-                    self.Report.windspeedmph = int(speed)
-                    self.Report.winddir = None
-                    self.Report.windcomp = None
-                else:
-                    fields = data.split(" ", 9)[0:9]
-                    comp = fields[2]
-                    deg = fields[3]
-                    speed = fields[6]
-                    speedkt = fields[8][1:]
-                    self.Report.winddir = int(deg[1:])
-                    self.Report.windcomp = comp.strip()
-                    self.Report.windspeed = (float(speed) * 0.44704)
-                    self.Report.windspeedkt = (int(speedkt))
-                    self.Report.windspeedmph = int(speed)
-
-            # visibility
-
-            elif header == "Visibility":
-                for visgroup in data.split():
-                    try:
-                        self.Report.vis = float(visgroup) * 1.609344
-                        break
-                    except ValueError:
-                        self.Report.vis = None
-                        break
-
-            # dew point
-
-            elif header == "Dew Point":
-                fnht, cels = data.split(None, 3)[0:3:2]
-                self.Report.dewpf = float(fnht)
-                # The string we have split is "(NN C)", hence the slice
-                self.Report.dewp = float(cels[1:])
-
-            # humidity
-
-            elif header == "Relative Humidity":
-                h = data.split("%", 1)[0]
-                self.Report.humid = int(h)
-
-            # pressure
-
-            elif header == "Pressure (altimeter)":
-                press = data.split(" ", 1)[0]
-                self.Report.press = float(press) * 33.863886
-                # 1 in = 25.4 mm => 1 inHg = 25.4 mmHg
-                self.Report.pressmmHg = float(press) * 25.4000
-
-            # shot weather desc. ("rain", "mist", ...)
-
-            elif header == "Weather":
-                self.Report.weather = data
-
-            # short desc. of sky conditions
-
-            elif header == "Sky conditions":
-                self.Report.sky = data
-
-            # the encoded report itself
-
-            elif header == "ob":
-                self.Report.code = data.strip()
-
-            # the cycle value ("time slot")
-
-            elif header == "cycle":
-                try:
-                    self.Report.cycle = int(data)
-                except ValueError:
-                    # cycle value is missing or garbled, assume cycle 0
-                    # TODO: parse the date/time header if it isn't too involved
-                    self.Report.cycle = 0
-
         # cloud info
         cloudinfo = self.extractCloudInformation()
         (cloudinfo, cloudtype, cloudpixmap) = cloudinfo
@@ -1042,6 +1266,14 @@ class ReportParser:
 
         return self.Report
 
+    def ParseReports(self, MetarReports):
+        """Parse each of the WeatherReport objects in MetarReports
+        and return them as a list, in the same order. All reports go
+        through the same parser, so the compiled patterns and the
+        header table are shared. Note: Like ParseReport(), this edits
+        the WeatherReport objects you supply!"""
+        return [self.ParseReport(report) for report in MetarReports]
+
 
 class ReportFetcher:
 
@@ -1070,7 +1302,8 @@ class ReportFetcher:
 
         return report
 
-    def FetchReport(self, StationCode=None, proxy=None):
+    def FetchReport(self, StationCode=None, proxy=None, timeout=None,
+                    max_age=0):
         """
         Fetch a report for a given station ID from the baseurl given
         upon creation of the ReportFetcher instance.
@@ -1080,6 +1313,15 @@ class ReportFetcher:
         http://squid.somenet.com:3128/
         If no proxy is specified, the environment variable http_proxy
         is inspected. If it isn't set, a direct connection is tried.
+        If timeout is not None, it is the number of seconds to wait for
+        the server before giving up, otherwise the global default socket
+        timeout applies.
+        If max_age is greater than 0, a report this process fetched from
+        the same URL less than max_age seconds ago is reused without
+        contacting the server. If max_age is None, the max-age the server
+        sent along with that report is used instead.
+        Once fetched, a report is only downloaded again if the server
+        says it has changed since, otherwise the known one is reused.
         """
         if self.stationid is None and StationCode is None:
             raise EmptyIDException(
@@ -1090,28 +1332,16 @@ class ReportFetcher:
         self.stationid = self.stationid.upper()
         self.reporturl = "%s%s.TXT" % (self.baseurl, self.stationid)
 
-        if proxy:
-            p_dict = {'http': proxy}
-            p_handler = urllib.request.ProxyHandler(p_dict)
-            opener = urllib.request.build_opener(
-                p_handler, urllib.request.HTTPHandler)
-            urllib.request.install_opener(opener)
+        cached = _REPORT_CACHE.get(self.reporturl)
+        if cached is not None and max_age is None:
+            max_age = cached[4]
+        if (cached is not None and max_age
+                and time.monotonic() - cached[0] < max_age):
+            self.fullreport = cached[1]
         else:
-            urllib.request.install_opener(
-                urllib.request.build_opener(urllib.request.ProxyHandler,
-                                            urllib.request.HTTPHandler))
-
-        try:
-            fn = urllib.request.urlopen(self.reporturl)
-        except urllib.error.HTTPError as why:
-            raise NetworkException(why)
-
-        # Dump entire report in a variable
-        self.fullreport = fn.read()
-
-        if fn.status != 200:
-            raise NetworkException(
-                "Could not fetch METAR report: %s" % (fn.status))
+            cached = self._fetch(proxy, timeout, cached)
+            _REPORT_CACHE[self.reporturl] = cached
+            self.fullreport = cached[1]
 
         report = WeatherReport(self.stationid)
         report.reporturl = self.reporturl
@@ -1120,6 +1350,46 @@ class ReportFetcher:
 
         return report
 
+    def FetchReports(self, StationCodes, proxy=None, timeout=None,
+                     max_age=0, max_workers=16):
+        """
+        Fetch the reports for several station IDs at once from the
+        baseurl given upon creation of the ReportFetcher instance and
+        return them as a list in the same order. The downloads run in
+        up to max_workers threads, so their network round trips
+        overlap. proxy, timeout and max_age are used as in
+        FetchReport().
+        """
+        StationCodes = list(StationCodes)
+        if not StationCodes:
+            return []
+
+        def fetch(code):
+            return ReportFetcher(code, self.baseurl).FetchReport(
+                proxy=proxy, timeout=timeout, max_age=max_age)
+
+        workers = min(max_workers, len(StationCodes))
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(fetch, StationCodes))
+
+    def _fetch(self, proxy, timeout, cached):
+        """
+        Fetch the report at self.reporturl and return it as a new
+        _REPORT_CACHE entry. If cached is the previous entry for that
+        URL, the server is asked to send the report only if it has
+        changed since, otherwise the cached report is kept.
+        """
+        if cached is None:
+            etag = last_modified = None
+        else:
+            etag, last_modified = cached[2:4]
+        report, etag, last_modified, max_age = fetch_report(
+            self.reporturl, proxy, timeout, etag, last_modified)
+        if report is None:
+            # Not Modified
+            report = cached[1]
+        return (time.monotonic(), report, etag, last_modified, max_age)
+
     def GetReport(self):
         """Get a previously fetched report again"""
         return self.report
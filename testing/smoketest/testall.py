@@ -4,7 +4,63 @@ import pymetar
 import sys
 import os
 
+# Published wind chill chart values, rounded to whole degrees:
+# (temperature, wind speed, wind chill). Fahrenheit and mph from the NWS
+# chart, Celsius and km/h from the Environment Canada one.
+WINDCHILL_F = ((0, 15, -19), (30, 10, 21), (-10, 20, -35))
+WINDCHILL_C = ((-10, 20, -18), (-20, 30, -33))
+
+
+def expected_windchill(temp, windspeed):
+    """Wind chill in C as getWindchill() should compute it, or None."""
+    if (temp is None or temp > 10 or windspeed is None or
+            windspeed * 3.6 <= 4.8):
+        return None
+    return (13.12 + 0.6215 * temp - 11.37 * (windspeed * 3.6) ** 0.16 +
+            0.3965 * temp * (windspeed * 3.6) ** 0.16)
+
+
+def expected_windchillf(tempf, windspeedmph):
+    """Wind chill in F as getWindchillF() should compute it."""
+    if (tempf is None or tempf > 50 or windspeedmph is None or
+            windspeedmph < 3):
+        return tempf
+    return (35.74 + 0.6215 * tempf - 35.75 * windspeedmph ** 0.16 +
+            0.4275 * tempf * windspeedmph ** 0.16)
+
+
+def differs(a, b):
+    """True unless a and b are both None or (nearly) the same number."""
+    if a is None or b is None:
+        return a is not b
+    return abs(a - b) > 1e-9
+
+
 if __name__ == "__main__":
+    for tempf, mph, chill in WINDCHILL_F:
+        if round(pymetar.windchill_fahrenheit(tempf, mph)) != chill:
+            sys.stderr.write("windchill_fahrenheit(%s, %s) is not %s\n" %
+                             (tempf, mph, chill))
+            sys.exit(1)
+    for temp, kph, chill in WINDCHILL_C:
+        if round(pymetar.windchill_celsius(temp, kph / 3.6)) != chill:
+            sys.stderr.write("windchill_celsius(%s, %s km/h) is not %s\n" %
+                             (temp, kph, chill))
+            sys.exit(1)
+
+    # 0 C / 0 F are valid temperatures and get a wind chill like any other
+    wr = pymetar.WeatherReport("TEST")
+    wr.temp, wr.windspeed = 0.0, 10 / 3.6
+    wr.tempf, wr.windspeedmph = 0.0, 15
+    if wr.getWindchill() is None or round(wr.getWindchill()) != -3:
+        sys.stderr.write("no or wrong wind chill at 0 C: %s\n" %
+                         (wr.getWindchill()))
+        sys.exit(1)
+    if round(wr.getWindchillF()) != -19:
+        sys.stderr.write("wrong wind chill at 0 F: %s\n" %
+                         (wr.getWindchillF()))
+        sys.exit(1)
+
     if len(sys.argv) > 1:
         repdir=sys.argv[1]
     else:
@@ -17,6 +73,8 @@ if __name__ == "__main__":
 
     reports.sort()
     count=0
+    failed=0
+    freezing=0
     rf=pymetar.ReportFetcher()
 
     for reportfile in reports:
@@ -34,7 +92,13 @@ if __name__ == "__main__":
         repo = rf.MakeReport(station, report)
         
         rp = pymetar.ReportParser()
-        pr = rp.ParseReport(repo)
+        # One report at a time, so a parser crash follows its station name
+        pr = rp.ParseReports([repo])[0]
+
+        # The wind chill getters only compute a value if the report
+        # doesn't give one
+        chill = pr.w_chill is None
+        chillf = pr.w_chillf is None
         
         a=pr.getFullReport()
         a=pr.getTemperatureCelsius()
@@ -72,7 +136,18 @@ if __name__ == "__main__":
         a=pr.getCloudinfo()
         a=pr.getConditions()
         a=pr.getWindchill()
+        if chill and differs(a, expected_windchill(pr.temp, pr.windspeed)):
+            sys.stdout.write("...wrong wind chill %s\n" % (a))
+            failed += 1
+            continue
+        if chill and pr.temp == 0 and a is not None:
+            freezing += 1
         a=pr.getWindchillF()
+        if chillf and differs(a, expected_windchillf(pr.tempf,
+                                                     pr.windspeedmph)):
+            sys.stdout.write("...wrong wind chill %s F\n" % (a))
+            failed += 1
+            continue
 
         pr._clearallfields()
 
@@ -80,6 +155,10 @@ if __name__ == "__main__":
     
         sys.stdout.write("...ok\n")
 
-    sys.stderr.write("%s station reports check out ok\n" % (count))
+    sys.stderr.write("%s station reports check out ok, %s of them got a "
+                     "wind chill at 0 C\n" % (count, freezing))
+    if failed:
+        sys.stderr.write("%s station reports failed\n" % (failed))
+        sys.exit(1)
 
 
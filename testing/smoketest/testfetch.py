@@ -0,0 +1,135 @@
+#!/usr/bin/python3 -tt
+
+# Fetch reports from a local HTTP server serving the report directory and
+# check that they arrive unchanged, and that fetching them again reuses
+# them: within max_age without asking the server, after that through 304
+# Not Modified answers.
+
+import functools
+import http.server
+import os
+import socket
+import sys
+import threading
+import urllib.request
+
+import pymetar
+
+# HTTP status codes the server answered with, in order
+statuses = []
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+
+    def log_request(self, code="-", size="-"):
+        statuses.append(int(code))
+
+    def log_message(self, format, *args):
+        # Keep the server's log out of the test output
+        pass
+
+
+def check(what, ok):
+    if not ok:
+        sys.stderr.write("FAILED: %s\n" % (what))
+        sys.exit(1)
+    sys.stdout.write("%s ...ok\n" % (what))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        repdir=sys.argv[1]
+    else:
+        repdir=("reports")
+
+    if len(sys.argv) > 2:
+        reports = sys.argv[2:]
+    else:
+        # A few stations are enough, leaving out leftovers like
+        # ".KISP.TXT.UJ.TXT"
+        reports = sorted(reportfile for reportfile in os.listdir(repdir)
+                         if reportfile.endswith(".TXT") and
+                         not reportfile.startswith("."))[:20]
+    stations = [reportfile[:-4] for reportfile in reports]
+
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(Handler, directory=repdir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rf = pymetar.ReportFetcher(
+        baseurl="http://127.0.0.1:%d/" % (server.server_address[1]))
+
+    fetched = rf.FetchReports(stations, timeout=10)
+    check("FetchReports() downloads every report",
+          statuses == [200] * len(stations))
+    for report, reportfile in zip(fetched, reports):
+        with open(os.path.join(repdir, reportfile), "rb") as fd:
+            check("%s is the served report" % (report.givenstationid),
+                  report.fullreport == fd.read())
+
+    del statuses[:]
+    again = rf.FetchReports(stations, timeout=10, max_age=3600)
+    check("fetch within max_age asks the server nothing", statuses == [])
+    check("fetch within max_age returns the same reports",
+          [r.fullreport for r in again] == [r.fullreport for r in fetched])
+
+    again = rf.FetchReports(stations, timeout=10)
+    check("refetch is answered with 304 Not Modified",
+          statuses == [304] * len(stations))
+    check("304 Not Modified returns the cached reports",
+          [r.fullreport for r in again] == [r.fullreport for r in fetched])
+
+    # An opener plugged in with set_opener() is used for every fetch
+    opened = []
+
+    class CountingHandler(urllib.request.HTTPHandler):
+
+        def http_open(self, req):
+            opened.append(req.full_url)
+            return urllib.request.HTTPHandler.http_open(self, req)
+
+    pymetar.set_opener(urllib.request.build_opener(CountingHandler))
+    rf.FetchReports(stations, timeout=10)
+    pymetar.set_opener(None)
+    check("set_opener() opener is used",
+          sorted(opened) == sorted(rf.baseurl + station + ".TXT"
+                                   for station in stations))
+
+    try:
+        rf.FetchReport("NOSUCHSTATION", timeout=10)
+    except pymetar.NetworkException:
+        check("missing report raises NetworkException", True)
+    else:
+        check("missing report raises NetworkException", False)
+
+    server.shutdown()
+    server.server_close()
+    # Nobody listens on the port any more
+    try:
+        rf.FetchReport(stations[0], timeout=10)
+    except pymetar.NetworkException:
+        check("refused connection raises NetworkException", True)
+    else:
+        check("refused connection raises NetworkException", False)
+
+    # A server answering with garbage instead of an HTTP status line
+    garbage = socket.socket()
+    garbage.bind(("127.0.0.1", 0))
+    garbage.listen(1)
+
+    def answer_garbage():
+        conn, addr = garbage.accept()
+        with conn:
+            conn.recv(4096)
+            conn.sendall(b"garbage\r\n\r\n")
+
+    threading.Thread(target=answer_garbage, daemon=True).start()
+    try:
+        pymetar.ReportFetcher(
+            stations[0], "http://127.0.0.1:%d/" % (garbage.getsockname()[1])
+        ).FetchReport(timeout=10)
+    except pymetar.NetworkException:
+        check("garbled answer raises NetworkException", True)
+    else:
+        check("garbled answer raises NetworkException", False)
+    garbage.close()
+    sys.stderr.write("%s station reports fetched ok\n" % (len(stations)))